@@ -0,0 +1,154 @@
+'use strict';
+// Worker thread receiving Win32 clipboard change notifications.
+//
+// Polling the clipboard means waking up on a timer forever, even when
+// nothing is copied for hours. Windows can instead notify us: a window
+// registered with AddClipboardFormatListener receives WM_CLIPBOARDUPDATE
+// every time the clipboard contents change. We create a hidden
+// message-only window (parent HWND_MESSAGE — never shown, never enumerated)
+// and forward each notification to the main thread, which runs the usual
+// clipboard read.
+//
+// Same threading model as windows-hook-worker.js: the window belongs to
+// this thread, so this thread must pump GetMessageW, and a dedicated worker
+// keeps that pump independent of whatever the main thread is doing. It is
+// kept separate from the keyboard hook worker so a failure here (which
+// main.js handles by falling back to polling) can't take the hook down.
+
+const { parentPort } = require('worker_threads');
+const koffi = require('koffi');
+
+// --- Win32 constants ---
+const WM_CLIPBOARDUPDATE = 0x031D;
+const HWND_MESSAGE = -3;
+
+// --- koffi types ---
+const WndProc = koffi.proto(
+  'intptr_t __stdcall WndProc(void *hWnd, uint32 uMsg, uintptr_t wParam, intptr_t lParam)'
+);
+
+const WNDCLASSEXW = koffi.struct('WNDCLASSEXW', {
+  cbSize: 'uint32',
+  style: 'uint32',
+  lpfnWndProc: koffi.pointer(WndProc),
+  cbClsExtra: 'int',
+  cbWndExtra: 'int',
+  hInstance: 'void *',
+  hIcon: 'void *',
+  hCursor: 'void *',
+  hbrBackground: 'void *',
+  lpszMenuName: 'const char16_t *',
+  lpszClassName: 'const char16_t *',
+  hIconSm: 'void *',
+});
+
+// MSG is needed for the GetMessageW pump loop below.
+const MSG = koffi.struct('MSG', {
+  hwnd: 'void *',
+  message: 'uint32',
+  wParam: 'uintptr_t',
+  lParam: 'intptr_t',
+  time: 'uint32',
+  pt_x: 'int32',
+  pt_y: 'int32',
+  lPrivate: 'uint32',
+});
+
+// --- Load DLLs and bind functions ---
+let user32, kernel32;
+try {
+  user32 = koffi.load('user32.dll');
+  kernel32 = koffi.load('kernel32.dll');
+} catch (err) {
+  parentPort.postMessage({ type: 'error', error: 'koffi.load: ' + String(err) });
+  process.exit(1);
+}
+
+const GetModuleHandleW = kernel32.func(
+  'void * __stdcall GetModuleHandleW(const char16_t *lpModuleName)'
+);
+const RegisterClassExW = user32.func(
+  'uint16 __stdcall RegisterClassExW(const WNDCLASSEXW *lpwcx)'
+);
+// hWndParent is declared as intptr_t so we can pass the HWND_MESSAGE
+// pseudo-handle (-3) as a plain integer.
+const CreateWindowExW = user32.func(
+  'void * __stdcall CreateWindowExW(uint32 dwExStyle, const char16_t *lpClassName, const char16_t *lpWindowName, uint32 dwStyle, int X, int Y, int nWidth, int nHeight, intptr_t hWndParent, void *hMenu, void *hInstance, void *lpParam)'
+);
+const DefWindowProcW = user32.func(
+  'intptr_t __stdcall DefWindowProcW(void *hWnd, uint32 uMsg, uintptr_t wParam, intptr_t lParam)'
+);
+const AddClipboardFormatListener = user32.func(
+  'int __stdcall AddClipboardFormatListener(void *hwnd)'
+);
+const RemoveClipboardFormatListener = user32.func(
+  'int __stdcall RemoveClipboardFormatListener(void *hwnd)'
+);
+const GetMessageW = user32.func(
+  'int __stdcall GetMessageW(_Out_ MSG *lpMsg, void *hWnd, uint32 wMsgFilterMin, uint32 wMsgFilterMax)'
+);
+const DispatchMessageW = user32.func(
+  'intptr_t __stdcall DispatchMessageW(MSG *lpMsg)'
+);
+
+// --- Window procedure ---
+// Only WM_CLIPBOARDUPDATE matters; everything else gets default handling.
+// Keep this trivial — the actual clipboard read happens on the main thread.
+const wndProc = koffi.register((hWnd, uMsg, wParam, lParam) => {
+  if (uMsg === WM_CLIPBOARDUPDATE) {
+    try { parentPort.postMessage({ type: 'change' }); } catch {}
+    return 0;
+  }
+  return DefWindowProcW(hWnd, uMsg, wParam, lParam);
+}, koffi.pointer(WndProc));
+
+// --- Create the message-only window and subscribe ---
+const CLASS_NAME = 'ClipboardTrayListener';
+const hInstance = GetModuleHandleW(null);
+
+const atom = RegisterClassExW({
+  cbSize: koffi.sizeof(WNDCLASSEXW),
+  style: 0,
+  lpfnWndProc: wndProc,
+  cbClsExtra: 0,
+  cbWndExtra: 0,
+  hInstance,
+  hIcon: null,
+  hCursor: null,
+  hbrBackground: null,
+  lpszMenuName: null,
+  lpszClassName: CLASS_NAME,
+  hIconSm: null,
+});
+if (!atom) {
+  parentPort.postMessage({ type: 'error', error: 'RegisterClassExW failed' });
+  process.exit(1);
+}
+
+const hwnd = CreateWindowExW(0, CLASS_NAME, CLASS_NAME, 0, 0, 0, 0, 0,
+  HWND_MESSAGE, null, hInstance, null);
+if (!hwnd) {
+  parentPort.postMessage({ type: 'error', error: 'CreateWindowExW returned null' });
+  process.exit(1);
+}
+
+if (!AddClipboardFormatListener(hwnd)) {
+  parentPort.postMessage({ type: 'error', error: 'AddClipboardFormatListener failed' });
+  process.exit(1);
+}
+
+parentPort.postMessage({ type: 'ready' });
+
+// --- Message pump ---
+// Blocks this worker thread; DispatchMessageW routes WM_CLIPBOARDUPDATE to
+// wndProc above. Exits on WM_QUIT or worker termination from the main thread.
+const msg = {};
+while (true) {
+  const ret = GetMessageW(msg, null, 0, 0);
+  if (ret <= 0) break;
+  DispatchMessageW(msg);
+}
+
+// --- Cleanup (only reached on clean WM_QUIT; worker.terminate skips this) ---
+try { RemoveClipboardFormatListener(hwnd); } catch {}
+try { koffi.unregister(wndProc); } catch {}
@@ -0,0 +1,88 @@
+'use strict';
+// Main-thread wrapper around the Win32 clipboard listener worker.
+//
+// Lets main.js react to clipboard changes instead of polling on a timer.
+// See lib/windows-clipboard-listener-worker.js for the message-only window
+// that receives WM_CLIPBOARDUPDATE.
+//
+// The listener can fail to start (or die later); `onReady` / `onStop` let
+// the caller switch between event-driven reads and its polling fallback.
+
+const { Worker } = require('worker_threads');
+const path = require('path');
+
+const CHANGE_SETTLE_MS = 25;
+
+let currentListener = null;
+
+function install({ onChange, onReady, onStop }) {
+  if (process.platform !== 'win32') return null;
+  if (currentListener) return currentListener;
+
+  let active = false;
+  const stop = () => {
+    const wasActive = active;
+    active = false;
+    currentListener = null;
+    if (wasActive) {
+      try { onStop(); } catch (e) { console.error('[clipboard-listener] onStop:', e); }
+    }
+  };
+
+  const worker = new Worker(path.join(__dirname, 'windows-clipboard-listener-worker.js'));
+
+  // Apps often fire several WM_CLIPBOARDUPDATEs for one copy (one per
+  // OpenClipboard/CloseClipboard round, e.g. text then HTML then an image).
+  // Reading after each would open the clipboard repeatedly mid-write; a
+  // short settle window turns the burst into one onChange that sees the
+  // final contents. Copies further apart than this are still read separately.
+  let changeQueued = false;
+  const flushChange = () => {
+    changeQueued = false;
+    if (!active) return;
+    try { onChange(); } catch (e) { console.error('[clipboard-listener] onChange:', e); }
+  };
+
+  worker.on('message', (msg) => {
+    switch (msg.type) {
+      case 'change':
+        if (!changeQueued) {
+          changeQueued = true;
+          setTimeout(flushChange, CHANGE_SETTLE_MS);
+        }
+        break;
+      case 'ready':
+        active = true;
+        try { onReady(); } catch (e) { console.error('[clipboard-listener] onReady:', e); }
+        break;
+      case 'error':
+        console.error('[clipboard-listener]', msg.error);
+        break;
+    }
+  });
+
+  worker.on('error', (err) => {
+    console.error('[clipboard-listener] worker crashed:', err);
+    stop();
+  });
+
+  worker.on('exit', (code) => {
+    if (code !== 0) console.error(`[clipboard-listener] worker exited with code ${code}`);
+    stop();
+  });
+
+  currentListener = {
+    isActive() { return active; },
+    uninstall() {
+      if (!currentListener) return;
+      currentListener = null;
+      active = false;
+      // Thread exit destroys the window, which drops the listener.
+      worker.terminate().catch(() => {});
+    },
+  };
+
+  return currentListener;
+}
+
+module.exports = { install };
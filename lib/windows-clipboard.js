@@ -0,0 +1,108 @@
+'use strict';
+// Cheap Windows clipboard probes via koffi FFI.
+//
+// Electron's clipboard API has no change notification and no change
+// counter, so polling with clipboard.readImage()/readText() opens the
+// clipboard (a global OS lock shared with every other app) and decodes the
+// DIB into a bitmap on every tick, even when nothing has changed.
+//
+// GetClipboardSequenceNumber is a single user32 call that never touches the
+// clipboard lock: Windows bumps the value whenever the clipboard contents
+// change, so an unchanged value means the previous read is still current.
+// See https://learn.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getclipboardsequencenumber
+//
+// When something did change, readSnapshot() answers "is there an image, and
+// if not, what's the text?" under one OpenClipboard/CloseClipboard pair —
+// Electron's readImage() + readText() would take the lock twice. PNG data
+// (what browsers and most image editors put alongside the DIB) is copied out
+// under the same open; a DIB-only image still needs readImage() to decode.
+
+// Stub out before requiring koffi, so other platforms never load the addon.
+if (process.platform !== 'win32') {
+  module.exports = {
+    // null = "unknown", callers must fall back to reading the clipboard.
+    getSequenceNumber() { return null; },
+    readSnapshot() { return null; },
+  };
+  return;
+}
+
+const koffi = require('koffi');
+const user32 = koffi.load('user32.dll');
+const kernel32 = koffi.load('kernel32.dll');
+
+const CF_DIB = 8;
+const CF_UNICODETEXT = 13;
+const CF_DIBV5 = 17;
+
+const GetClipboardSequenceNumber = user32.func(
+  'uint32 __stdcall GetClipboardSequenceNumber()'
+);
+const OpenClipboard = user32.func(
+  'int __stdcall OpenClipboard(void *hWndNewOwner)'
+);
+const CloseClipboard = user32.func(
+  'int __stdcall CloseClipboard()'
+);
+const IsClipboardFormatAvailable = user32.func(
+  'int __stdcall IsClipboardFormatAvailable(uint32 format)'
+);
+const GetClipboardData = user32.func(
+  'void * __stdcall GetClipboardData(uint32 uFormat)'
+);
+const GlobalLock = kernel32.func(
+  'void * __stdcall GlobalLock(void *hMem)'
+);
+const GlobalUnlock = kernel32.func(
+  'int __stdcall GlobalUnlock(void *hMem)'
+);
+const GlobalSize = kernel32.func(
+  'size_t __stdcall GlobalSize(void *hMem)'
+);
+const RegisterClipboardFormatW = user32.func(
+  'uint32 __stdcall RegisterClipboardFormatW(const char16_t *lpszFormat)'
+);
+
+// Registered formats get a per-session id; "PNG" is the conventional name.
+const CF_PNG = RegisterClipboardFormatW('PNG');
+
+function getSequenceNumber() {
+  return GetClipboardSequenceNumber();
+}
+
+// Locks `format`'s global memory for the duration of `fn(ptr, hMem)`.
+// Returns fn's result, or null if the format has no data.
+function withClipboardData(format, fn) {
+  const hMem = GetClipboardData(format);
+  const ptr = hMem ? GlobalLock(hMem) : null;
+  if (!ptr) return null;
+  try {
+    return fn(ptr, hMem);
+  } finally {
+    GlobalUnlock(hMem);
+  }
+}
+
+// Returns { hasImage, png, text } or null if the clipboard couldn't be
+// opened. `png` is a Buffer when the clipboard carries PNG data, else null.
+// `text` is only read when there is no image (the poller prefers images).
+function readSnapshot() {
+  if (!OpenClipboard(null)) return null;
+  try {
+    const hasPng = !!(CF_PNG && IsClipboardFormatAvailable(CF_PNG));
+    const hasImage = hasPng ||
+      !!(IsClipboardFormatAvailable(CF_DIB) || IsClipboardFormatAvailable(CF_DIBV5));
+    const png = hasPng
+      ? withClipboardData(CF_PNG, (ptr, hMem) => Buffer.from(koffi.decode(ptr, 'uint8', Number(GlobalSize(hMem)))))
+      : null;
+    let text = '';
+    if (!hasImage && IsClipboardFormatAvailable(CF_UNICODETEXT)) {
+      text = withClipboardData(CF_UNICODETEXT, ptr => koffi.decode(ptr, 'char16_t', -1)) || '';
+    }
+    return { hasImage, png, text };
+  } finally {
+    CloseClipboard();
+  }
+}
+
+module.exports = { getSequenceNumber, readSnapshot };
@@ -21,8 +21,7 @@
 // Electron ships by default on Windows) and use a flat struct with explicit
 // padding that matches the x64 memory layout (40 bytes total).
 
-const koffi = require('koffi');
-
+// koffi is a native addon — only load it where it's used.
 if (process.platform !== 'win32') {
   module.exports = {
     sendCtrlV() {},
@@ -32,6 +31,7 @@ if (process.platform !== 'win32') {
   return;
 }
 
+const koffi = require('koffi');
 const user32 = koffi.load('user32.dll');
 
 // x64 INPUT struct layout (40 bytes):
@@ -5,16 +5,20 @@ const fs = require('fs');
 const crypto = require('crypto');
 const os = require('os');
 const { exec, spawn } = require('child_process');
+const { Readable } = require('stream');
 
 // Windows-specific fast input (keybd_event, Get/SetForegroundWindow).
 // Module is a no-op on non-Windows platforms so it's safe to require unconditionally.
 const winPaste = require('./lib/windows-paste');
+// Windows clipboard sequence number + single-open snapshot for the poller.
+const winClipboard = require('./lib/windows-clipboard');
 
 app.setName('Clipboard Tray');
 
 // --- Paths ---
 const SCRIPT_DIR = __dirname;
 const DB_PATH = path.join(SCRIPT_DIR, 'clipboard-history.json');
+const LOG_PATH = path.join(SCRIPT_DIR, 'clipboard-history.log');
 const SETTINGS_PATH = path.join(SCRIPT_DIR, 'clipboard-settings.json');
 const IMG_DIR = path.join(SCRIPT_DIR, 'clipboard-images');
 
@@ -54,31 +58,158 @@ function saveSettingsFile() {
 let settings = loadSettings();
 
 // --- History ---
+// Storage is a JSON snapshot (DB_PATH) plus an append-only op log (LOG_PATH).
+// New clipboard entries — by far the most frequent mutation — append one
+// line to the log instead of rewriting the whole snapshot. Every other
+// mutation goes through saveHistory(), whose flush compacts: it rewrites the
+// snapshot and truncates the log.
+//
+// The log is also compacted once it outgrows the snapshot: more than twice
+// as many ops as history items (at least HISTORY_LOG_MIN_OPS). A compaction
+// costs O(history), so scaling the threshold with history keeps the
+// amortized write per copy O(1) for large histories too, while the log —
+// and the replay at startup — stays proportional to the snapshot.
+const HISTORY_LOG_MIN_OPS = 200;
+let historyLogFd = null;
+let historyLogOps = 0;
+
+// Generation of the snapshot the log currently extends. The snapshot is
+// stored as `{ gen, items }` and every compaction writes gen + 1; ops are
+// stamped with the generation they extend, and replay skips ops from any
+// other one: those are already folded into a later compaction — left behind
+// by a crash between the snapshot rename and the log truncate — and
+// replaying them would resurrect items deleted or pruned since.
+let snapshotGen = 0;
+
 function loadHistory() {
+  let items;
   try {
-    return JSON.parse(fs.readFileSync(DB_PATH, 'utf-8'));
+    const data = JSON.parse(fs.readFileSync(DB_PATH, 'utf-8'));
+    // Snapshots written before generations were a bare array.
+    if (Array.isArray(data)) {
+      items = data;
+    } else {
+      items = Array.isArray(data.items) ? data.items : [];
+      snapshotGen = data.gen || 0;
+    }
   } catch {
-    return [];
+    items = [];
   }
+  return replayHistoryLog(items);
 }
 
-function saveHistory() {
-  fs.writeFileSync(DB_PATH, JSON.stringify(history));
+// Re-applies ops logged since the last compaction. Mirrors addToHistory():
+// drop any existing copy of the content, then put the entry on top.
+function replayHistoryLog(items) {
+  let lines;
+  try {
+    lines = fs.readFileSync(LOG_PATH, 'utf-8').split('\n');
+  } catch {
+    return items;
+  }
+  for (const line of lines) {
+    if (!line) continue;
+    let op;
+    try { op = JSON.parse(line); } catch { continue; } // torn last line after a crash
+    if (op.op !== 'add' || !op.item) continue;
+    if (op.gen !== undefined && op.gen !== snapshotGen) continue; // stale
+    const it = op.item;
+    const idx = it.type === 'image'
+      ? items.findIndex(h => h.type === 'image' && h.image === it.image)
+      : items.findIndex(h => h.text === it.text);
+    if (idx >= 0) items.splice(idx, 1);
+    items.unshift(it);
+    historyLogOps++;
+  }
+  return items;
+}
+
+function appendHistoryOp(op) {
+  historyVersion++;
+  const line = JSON.stringify({ ...op, gen: snapshotGen }) + '\n';
+  try {
+    if (historyLogFd === null) historyLogFd = fs.openSync(LOG_PATH, 'a');
+    fs.writeSync(historyLogFd, line);
+  } catch (e) {
+    console.error('[history] log append failed:', e);
+    saveHistory(); // the snapshot is authoritative — fall back to a full write
+    return;
+  }
+  dbBytes += Buffer.byteLength(line);
+  if (++historyLogOps > Math.max(HISTORY_LOG_MIN_OPS, 2 * history.length)) saveHistory();
   scheduleSyncMerge();
+}
+
+// Mutators call saveHistory(), which updates in-memory dependents right away
+// and schedules one coalesced write. A burst of copies/pins/deletes costs a
+// single full rewrite per HISTORY_FLUSH_MS instead of one per event.
+const HISTORY_FLUSH_MS = 1500;
+let historyFlushTimer = null;
+
+// Bumped on every history mutation. The renderer polls get-history with the
+// version it last saw and only receives (and re-renders) the list when it
+// differs — an idle popup no longer clones the whole history every second.
+let historyVersion = 0;
+
+function saveHistory() {
+  historyVersion++;
+  numpadSlots = null;
+  oldestUnpinnedTs = 0;
+  if (!historyFlushTimer) historyFlushTimer = setTimeout(flushHistory, HISTORY_FLUSH_MS);
   syncHookState();
 }
 
+// history serialized as JSON, cached per historyVersion. A flush and the
+// sync push it schedules (and the merge's change check) share one
+// JSON.stringify of the whole list instead of each doing their own.
+let historyJsonCache = { version: -1, json: '' };
+
+function historyJSON() {
+  if (historyJsonCache.version !== historyVersion) {
+    historyJsonCache = { version: historyVersion, json: JSON.stringify(history) };
+  }
+  return historyJsonCache.json;
+}
+
+function flushHistory() {
+  if (historyFlushTimer) {
+    clearTimeout(historyFlushTimer);
+    historyFlushTimer = null;
+  }
+  // Spliced rather than re-stringified so the sync push, which writes the
+  // bare array, keeps sharing historyJSON()'s cached serialization.
+  const data = `{"gen":${snapshotGen + 1},"items":${historyJSON()}}`;
+  // Write-then-rename so a crash mid-write never leaves a truncated DB.
+  const tmpPath = DB_PATH + '.tmp';
+  try {
+    fs.writeFileSync(tmpPath, data);
+    fs.renameSync(tmpPath, DB_PATH);
+  } catch (e) {
+    console.error('[history] save failed:', e);
+    return;
+  }
+  snapshotGen++;
+  // The snapshot now contains every logged op — start a fresh log. Truncate
+  // by path: the append fd can't do it on Windows, where libuv opens 'a'
+  // without write-data access and ftruncate fails.
+  if (historyLogOps) {
+    try {
+      fs.truncateSync(LOG_PATH, 0);
+      historyLogOps = 0;
+    } catch (e) {
+      console.error('[history] log truncate failed:', e);
+    }
+  }
+  dbBytes = Buffer.byteLength(data);
+  scheduleSyncMerge();
+}
+
 // Reflect current history/popup state into the Windows hook's shared
 // buffer so the hook worker can synchronously decide whether to swallow
 // plain numpad keypresses.
 function syncHookState() {
   if (!windowsHook) return;
-  const assigned = new Set();
-  for (const item of history) {
-    const n = numpadSlotOf(item);
-    if (n != null) assigned.add(n);
-  }
-  windowsHook.setSlotAssignments(assigned);
+  windowsHook.setSlotAssignments(new Set(getNumpadSlots().keys()));
 }
 
 let history = loadHistory();
@@ -115,57 +246,162 @@ function numpadSlotOf(item) {
 function groupsOf(item) {
   return item.pin && Array.isArray(item.pin.groups) ? item.pin.groups : [];
 }
-function hasNumpadSlot(item, n) { return numpadSlotOf(item) === n; }
 function ensurePin(item) {
   if (!item.pin) item.pin = {};
   return item.pin;
 }
 
-function getStorageBytes() {
-  let total = 0;
-  try { total = fs.statSync(DB_PATH).size; } catch {}
+// Numpad slot -> item, so a numpad press doesn't scan history. Built lazily;
+// anything that can change which item holds a slot (saveHistory(),
+// addToHistory(), a sync merge) drops it.
+let numpadSlots = null;
+
+function getNumpadSlots() {
+  if (!numpadSlots) {
+    numpadSlots = new Map();
+    for (const item of history) {
+      const n = numpadSlotOf(item);
+      if (n != null && !numpadSlots.has(n)) numpadSlots.set(n, item);
+    }
+  }
+  return numpadSlots;
+}
+
+// --- Storage accounting ---
+// Running byte counts for the storage cap. Seeded by one directory walk at
+// startup and kept in step by every path that writes or deletes files, so
+// the prune loop never re-stats the whole image folder per eviction.
+let dbBytes = 0;
+let imgBytes = 0;
+
+function measureStorage() {
+  dbBytes = 0;
+  imgBytes = 0;
+  try { dbBytes = fs.statSync(DB_PATH).size; } catch {}
+  try { dbBytes += fs.statSync(LOG_PATH).size; } catch {}
   try {
-    for (const fname of fs.readdirSync(IMG_DIR)) {
-      try { total += fs.statSync(path.join(IMG_DIR, fname)).size; } catch {}
+    for (const ent of fs.readdirSync(IMG_DIR, { withFileTypes: true })) {
+      if (!ent.isFile()) continue;
+      try { imgBytes += fs.statSync(path.join(IMG_DIR, ent.name)).size; } catch {}
     }
   } catch {}
-  return total;
+}
+
+measureStorage();
+
+function getStorageBytes() {
+  return dbBytes + imgBytes;
 }
 
 function removeItemImage(item) {
   if (item.type !== 'image') return;
   const fname = item.image || '';
-  if (history.filter(h => h.image === fname).length <= 1) {
-    try { fs.unlinkSync(path.join(IMG_DIR, fname)); } catch {}
+  if (history.filter(h => h.image === fname).length <= 1) releaseImage(fname);
+}
+
+// Drops an image no history item references any more: its caches and files.
+function releaseImage(fname) {
+  thumbCache.delete(thumbName(fname));
+  if (pasteImageCache && pasteImageCache.fname === fname) pasteImageCache = null;
+  // Still being written — unlink once the files have landed, unless the same
+  // image was copied again in the meantime and reuses them.
+  const pending = pendingImages.get(fname);
+  if (pending) {
+    pending.written.then(() => {
+      if (!history.some(h => h.image === fname)) unlinkImageFiles(fname);
+    });
+  } else {
+    unlinkImageFiles(fname);
   }
 }
 
+function unlinkImageFiles(fname) {
+  for (const f of [fname, thumbName(fname)]) {
+    const fpath = path.join(IMG_DIR, f);
+    try {
+      const { size } = fs.statSync(fpath);
+      fs.unlinkSync(fpath);
+      imgBytes -= size;
+    } catch {}
+  }
+}
+
+// Removes history[idx] together with its image file (if unshared) and its
+// dedup index entry.
+function removeHistoryAt(idx) {
+  const item = history[idx];
+  removeItemImage(item);
+  history.splice(idx, 1);
+  forgetHistoryItem(item);
+}
+
+// A prune walks all of history, so new copies don't run one each: at most
+// every PRUNE_INTERVAL_MS, or straight away once storage nears the cap.
+// A timer in app.whenReady runs pruneExpired() so age expiry still happens
+// when nothing is being copied.
+const PRUNE_INTERVAL_MS = 30000;
+let lastPruneAt = 0;
+
+// ts of the oldest unpinned item, as of the last prune (0 = unknown). Lets
+// the idle timer skip the full walk until something can actually expire.
+// saveHistory() and sync merges reset it — they can unpin or bring in old
+// items; new copies are never older, so addToHistory() only lowers it.
+let oldestUnpinnedTs = 0;
+
+function pruneExpired() {
+  if (Date.now() / 1000 - oldestUnpinnedTs > settings.max_age_days * 86400) pruneHistory();
+}
+
+function maybePruneHistory() {
+  const maxBytes = settings.max_size_gb * 1024 ** 3;
+  if (Date.now() - lastPruneAt < PRUNE_INTERVAL_MS && getStorageBytes() <= 0.9 * maxBytes) return;
+  pruneHistory();
+}
+
 function pruneHistory() {
+  lastPruneAt = Date.now();
   const now = Date.now() / 1000;
   const maxAge = settings.max_age_days * 86400;
   const maxBytes = settings.max_size_gb * 1024 ** 3;
-  let changed = false;
 
-  for (let i = history.length - 1; i >= 0; i--) {
-    if (!isPinned(history[i]) && (now - (history[i].ts || 0)) > maxAge) {
-      removeItemImage(history[i]);
-      history.splice(i, 1);
-      changed = true;
-    }
+  // Evictions are marked and history is compacted once at the end, rather
+  // than a splice() plus an image-refcount filter() over history for every
+  // removed item. Image files go as soon as their last reference does, so
+  // the cap check below sees the freed bytes.
+  const imageRefs = new Map();
+  for (const h of history) {
+    if (h.type === 'image') imageRefs.set(h.image, (imageRefs.get(h.image) || 0) + 1);
   }
+  const evicted = new Set();
+  const evict = (item) => {
+    evicted.add(item);
+    forgetHistoryItem(item);
+    if (item.type !== 'image') return;
+    const refs = imageRefs.get(item.image) - 1;
+    imageRefs.set(item.image, refs);
+    if (refs === 0) releaseImage(item.image);
+  };
 
-  while (getStorageBytes() > maxBytes) {
-    let idx = -1;
-    for (let i = history.length - 1; i >= 0; i--) {
-      if (!isPinned(history[i])) { idx = i; break; }
-    }
-    if (idx < 0) break;
-    removeItemImage(history[idx]);
-    history.splice(idx, 1);
-    changed = true;
+  for (const h of history) {
+    if (!isPinned(h) && (now - (h.ts || 0)) > maxAge) evict(h);
   }
 
-  if (changed) saveHistory();
+  // Oldest unpinned first, until under the cap.
+  for (let i = history.length - 1; i >= 0 && getStorageBytes() > maxBytes; i--) {
+    const h = history[i];
+    if (!isPinned(h) && !evicted.has(h)) evict(h);
+  }
+
+  let kept = 0;
+  let oldest = Infinity;
+  for (const h of history) {
+    if (evicted.has(h)) continue;
+    history[kept++] = h;
+    if (!isPinned(h)) oldest = Math.min(oldest, h.ts || 0);
+  }
+  history.length = kept;
+  if (evicted.size) saveHistory();
+  oldestUnpinnedTs = oldest;
 }
 
 // --- Migration: old settings.numpad_slots -> per-item pin ---
@@ -174,20 +410,37 @@ function migrateNumpad() {
   const oldSlots = settings.numpad_slots;
 
   if (oldSlots) {
+    // One pass over history up front instead of a find() per slot. The first
+    // (newest) item with given content wins, as find() did.
+    const byImage = new Map();
+    const byText = new Map();
+    for (const h of history) {
+      const [map, key] = h.type === 'image' ? [byImage, h.image] : [byText, h.text];
+      if (!map.has(key)) map.set(key, h);
+    }
     for (const [numStr, slot] of Object.entries(oldSlots)) {
       const num = parseInt(numStr);
       if (slot.type === 'image') {
-        const match = history.find(h => h.type === 'image' && h.image === slot.image);
+        const match = byImage.get(slot.image);
         if (match) ensurePin(match).number = num;
-        else history.unshift({ type: 'image', image: slot.image, ts: Date.now() / 1000, pin: { number: num } });
+        else {
+          const item = { type: 'image', image: slot.image, ts: Date.now() / 1000, pin: { number: num } };
+          history.unshift(item);
+          byImage.set(slot.image, item);
+        }
       } else {
         const text = slot.text || '';
-        const match = history.find(h => h.type !== 'image' && h.text === text);
+        const match = byText.get(text);
         if (match) ensurePin(match).number = num;
-        else history.unshift({ type: 'text', text, ts: Date.now() / 1000, pin: { number: num } });
+        else {
+          const item = { type: 'text', text, ts: Date.now() / 1000, pin: { number: num } };
+          history.unshift(item);
+          byText.set(text, item);
+        }
       }
     }
     delete settings.numpad_slots;
+    invalidateHistoryIndex();
     saveHistory();
     saveSettingsFile();
   } else if (!history.length) {
@@ -196,6 +449,7 @@ function migrateNumpad() {
         history.unshift({ type: 'text', text: AHK_PRESETS[num], ts: Date.now() / 1000, pin: { number: num } });
       }
     }
+    invalidateHistoryIndex();
     saveHistory();
   }
 }
@@ -246,32 +500,59 @@ function mergeGroups(local, remote) {
 }
 
 function syncImages(remoteImgDir) {
+  imagesLanded = false;
   if (!fs.existsSync(remoteImgDir)) fs.mkdirSync(remoteImgDir, { recursive: true });
 
-  // Copy remote -> local (missing locally)
+  // One listing per side and set lookups, instead of an existsSync round
+  // trip per file — each of those is a network hop on a cloud-drive mount.
+  let localFiles, remoteFiles;
   try {
-    for (const fname of fs.readdirSync(remoteImgDir)) {
+    localFiles = syncableImages(IMG_DIR);
+    remoteFiles = syncableImages(remoteImgDir);
+  } catch { return; }
+
+  // Copy remote -> local (missing locally)
+  for (const fname of remoteFiles) {
+    if (localFiles.has(fname)) continue;
+    try {
       const localPath = path.join(IMG_DIR, fname);
-      if (!fs.existsSync(localPath)) {
-        fs.copyFileSync(path.join(remoteImgDir, fname), localPath);
-      }
-    }
-  } catch {}
+      fs.copyFileSync(path.join(remoteImgDir, fname), localPath);
+      imgBytes += fs.statSync(localPath).size;
+    } catch {}
+  }
 
   // Copy local -> remote (missing remotely)
-  try {
-    for (const fname of fs.readdirSync(IMG_DIR)) {
-      const remotePath = path.join(remoteImgDir, fname);
-      if (!fs.existsSync(remotePath)) {
-        fs.copyFileSync(path.join(IMG_DIR, fname), remotePath);
-      }
-    }
-  } catch {}
+  for (const fname of localFiles) {
+    if (remoteFiles.has(fname)) continue;
+    try { fs.copyFileSync(path.join(IMG_DIR, fname), path.join(remoteImgDir, fname)); } catch {}
+  }
+}
+
+// Image files in `dir`. Thumbnails are derived per machine (readThumbnail)
+// and never synced.
+function syncableImages(dir) {
+  const names = new Set();
+  for (const ent of fs.readdirSync(dir, { withFileTypes: true })) {
+    if (ent.isFile() && !ent.name.endsWith(THUMB_SUFFIX) && !ent.name.endsWith('.tmp')) names.add(ent.name);
+  }
+  return names;
+}
+
+// Newest of the snapshot and the op log — either changing means local edits.
+function localHistoryMtime() {
+  let mtime = 0;
+  for (const p of [DB_PATH, LOG_PATH]) {
+    try { mtime = Math.max(mtime, fs.statSync(p).mtimeMs); } catch {}
+  }
+  return mtime;
 }
 
 let lastSyncMtime = 0;
 let syncDebounceTimer = null;
 let insideSync = false;
+// Set when an async image write lands, so the next sync copies it even if
+// history itself hasn't changed since the last one.
+let imagesLanded = false;
 
 function scheduleSyncMerge() {
   if (!settings.sync_path || insideSync) return;
@@ -293,17 +574,19 @@ function syncMerge() {
 
     let remoteMtime = 0;
     try { remoteMtime = fs.statSync(remoteDbPath).mtimeMs; } catch {}
-    let localMtime = 0;
-    try { localMtime = fs.statSync(DB_PATH).mtimeMs; } catch {}
+    const localMtime = localHistoryMtime();
     const localChangedSince = localMtime > lastSyncMtime;
     const remoteChangedSince = remoteMtime > lastSyncMtime;
-    if (!localChangedSince && !remoteChangedSince) return;
+    if (!localChangedSince && !remoteChangedSince) {
+      if (imagesLanded) syncImages(remoteImgDir);
+      return;
+    }
 
     // Local-only changes: push local to remote without merging. Prevents the
     // resurrection bug where a deleted group comes back because the merge
     // sees the "still has group" remote copy as higher-scored.
     if (localChangedSince && !remoteChangedSince) {
-      try { fs.writeFileSync(remoteDbPath, JSON.stringify(history)); } catch {}
+      try { fs.writeFileSync(remoteDbPath, historyJSON()); } catch {}
       try {
         const remoteSave = { ...settings };
         delete remoteSave.numpad_slots;
@@ -313,7 +596,7 @@ function syncMerge() {
       syncImages(remoteImgDir);
       try {
         const rmt = fs.statSync(remoteDbPath).mtimeMs;
-        const lmt = fs.statSync(DB_PATH).mtimeMs;
+        const lmt = localHistoryMtime();
         lastSyncMtime = Math.max(rmt, lmt);
       } catch {}
       return;
@@ -329,12 +612,18 @@ function syncMerge() {
 
     // Merge histories
     const merged = mergeHistories(history, remoteHistory);
-    const localChanged = JSON.stringify(merged) !== JSON.stringify(history);
-    const remoteChanged = JSON.stringify(merged) !== JSON.stringify(remoteHistory);
+    const mergedJson = JSON.stringify(merged);
+    const localChanged = mergedJson !== historyJSON();
+    const remoteChanged = mergedJson !== JSON.stringify(remoteHistory);
 
     if (localChanged) {
       history.length = 0;
       history.push(...merged);
+      invalidateHistoryIndex();
+      historyVersion++;
+      historyJsonCache = { version: historyVersion, json: mergedJson };
+      numpadSlots = null;
+      oldestUnpinnedTs = 0;
     }
 
     // Merge groups from settings + any groups found on history items
@@ -348,11 +637,13 @@ function syncMerge() {
 
     // Only write if something actually changed
     if (localChanged || groupsChanged) {
-      saveHistory();
+      // Flush synchronously: the mtime bookkeeping below must see this write.
+      flushHistory();
+      syncHookState();
       saveSettingsFile();
     }
     if (remoteChanged || groupsChanged) {
-      try { fs.writeFileSync(remoteDbPath, JSON.stringify(merged)); } catch {}
+      try { fs.writeFileSync(remoteDbPath, mergedJson); } catch {}
       try {
         const remoteSave = { ...settings };
         delete remoteSave.numpad_slots;
@@ -364,99 +655,352 @@ function syncMerge() {
     // Update mtime tracking
     try {
       const rmt = fs.statSync(path.join(syncPath, 'clipboard-history.json')).mtimeMs;
-      const lmt = fs.statSync(DB_PATH).mtimeMs;
+      const lmt = localHistoryMtime();
       lastSyncMtime = Math.max(rmt, lmt);
     } catch {}
   } finally { insideSync = false; }
 }
 
 // --- Image helpers ---
-function imageHash(buffer) {
-  return crypto.createHash('md5').update(buffer).digest('hex').slice(0, 12);
+// Content key for a clipboard image. Hashes the raw bitmap rather than PNG
+// bytes: PNG-encoding a large screenshot costs far more than hashing it, and
+// the poller only needs the key. Dimensions are mixed in so two bitmaps
+// with the same bytes but a different shape don't collide.
+function imageHash(nativeImg) {
+  const { width, height } = nativeImg.getSize();
+  return crypto.createHash('md5')
+    .update(`${width}x${height}:`)
+    .update(nativeImg.toBitmap())
+    .digest('hex').slice(0, 12);
+}
+
+// Images whose files are still being written, by fname -> { img, buf, written }.
+// PNG encoding has to stay on the main thread (nativeImage isn't
+// transferable), but the disk writes go to libuv's threadpool so a large
+// screenshot doesn't hold up the next clipboard read. Anything that needs
+// the file before it lands uses `img` or awaits `written`.
+const pendingImages = new Map();
+
+// Write-then-rename so readers (and sync) never see a half-written PNG.
+async function writeImageFile(fname, buf) {
+  const fpath = path.join(IMG_DIR, fname);
+  await fs.promises.writeFile(fpath + '.tmp', buf);
+  await fs.promises.rename(fpath + '.tmp', fpath);
 }
 
-function saveClipboardImage(nativeImg) {
-  const buf = nativeImg.toPNG();
-  const hash = imageHash(buf);
+// `hash` is optional: the poller already computed it to detect the change,
+// so it passes it through instead of paying for a second hash.
+function saveClipboardImage(nativeImg, hash = imageHash(nativeImg)) {
   const fname = `${hash}.png`;
   const fpath = path.join(IMG_DIR, fname);
-  if (!fs.existsSync(fpath)) fs.writeFileSync(fpath, buf);
+  if (!pendingImages.has(fname) && !fs.existsSync(fpath)) {
+    const buf = nativeImg.toPNG();
+    const thumbBuf = thumbnailPNG(nativeImg);
+    // The list asks for the thumbnail right away — serve it from memory.
+    cacheThumbnail(thumbName(fname), thumbBuf);
+    // Counted up front so a prune that runs before the write lands still
+    // sees the bytes; handed back if a write fails.
+    imgBytes += buf.length + thumbBuf.length;
+    const written = writeImageFile(fname, buf)
+      .catch(e => { imgBytes -= buf.length + thumbBuf.length; throw e; })
+      .then(() => writeImageFile(thumbName(fname), thumbBuf)
+        .catch(e => { imgBytes -= thumbBuf.length; throw e; }))
+      .then(() => {
+        // The capture's history op has usually been synced by now, with the
+        // image still skipped as pending — push it once it's on disk.
+        imagesLanded = true;
+        scheduleSyncMerge();
+      })
+      .catch(e => console.error('[images] save failed:', e))
+      .finally(() => pendingImages.delete(fname));
+    pendingImages.set(fname, { img: nativeImg, buf, written });
+  }
   const size = nativeImg.getSize();
   return { fname, width: size.width, height: size.height };
 }
 
+// --- Thumbnails ---
+// The list shows images at most 60px tall, so it loads `{hash}.thumb.png`
+// (2x that, for HiDPI) instead of decoding the full-size original for every
+// row. Made at capture time; images that predate thumbnails or arrived via
+// sync get one on first request (readThumbnail).
+const THUMB_SUFFIX = '.thumb.png';
+const THUMB_MAX_W = 720;
+const THUMB_MAX_H = 120;
+
+function thumbName(fname) {
+  return fname.replace(/\.png$/, THUMB_SUFFIX);
+}
+
+function thumbnailPNG(nativeImg) {
+  const { width, height } = nativeImg.getSize();
+  const scale = Math.min(1, THUMB_MAX_W / width, THUMB_MAX_H / height);
+  const thumb = scale < 1
+    ? nativeImg.resize({ width: Math.max(1, Math.round(width * scale)),
+                         height: Math.max(1, Math.round(height * scale)), quality: 'good' })
+    : nativeImg;
+  return thumb.toPNG();
+}
+
+function writeThumbnail(nativeImg, fname) {
+  const buf = thumbnailPNG(nativeImg);
+  try {
+    fs.writeFileSync(path.join(IMG_DIR, thumbName(fname)), buf);
+    imgBytes += buf.length;
+  } catch {}
+  return buf;
+}
+
+function readThumbnail(thumbFname) {
+  try { return fs.readFileSync(path.join(IMG_DIR, thumbFname)); } catch {}
+  const fname = thumbFname.slice(0, -THUMB_SUFFIX.length) + '.png';
+  const img = nativeImage.createFromPath(path.join(IMG_DIR, fname));
+  if (img.isEmpty()) throw new Error(`no image for ${thumbFname}`);
+  return writeThumbnail(img, fname);
+}
+
+// Recently served thumbnails. The list re-renders — and re-requests its
+// images — on every history change, so keep the hot set in memory. Bounded
+// LRU (Map insertion order = recency) so long sessions don't grow forever.
+const THUMB_CACHE_MAX = 120;
+const thumbCache = new Map();
+
+function cachedThumbnail(thumbFname) {
+  const buf = thumbCache.get(thumbFname) || readThumbnail(thumbFname);
+  cacheThumbnail(thumbFname, buf);
+  return buf;
+}
+
+function cacheThumbnail(thumbFname, buf) {
+  if (!thumbCache.delete(thumbFname) && thumbCache.size >= THUMB_CACHE_MAX) {
+    thumbCache.delete(thumbCache.keys().next().value);
+  }
+  thumbCache.set(thumbFname, buf);
+}
+
 // --- Clipboard polling ---
 let lastText = '';
 let lastImgHash = '';
+let lastSeq = null;
+let lastChangeAt = Date.now();
 let pollGate = true;
 
-function addToHistory(entry, matchFn) {
+// --- Dedup index ---
+// Content -> item maps so a new copy finds its existing entry with one map
+// lookup instead of string-comparing against every item in history. The
+// hit's position is still found by an identity scan, and the move to front
+// shifts the items above it, so a re-copy costs O(position) — cheap
+// pointer compares and moves, but not O(1). Built lazily. addToHistory(),
+// removeHistoryAt() and pruneHistory() keep it current; code that adds,
+// replaces or re-texts items any other way calls invalidateHistoryIndex().
+let historyIndex = null;
+
+function sameContent(a, b) {
+  return b.type === 'image' ? a.type === 'image' && a.image === b.image : a.text === b.text;
+}
+
+function getHistoryIndex() {
+  if (!historyIndex) {
+    historyIndex = { text: new Map(), image: new Map() };
+    // Walk bottom-up so the topmost duplicate (what findIndex would hit) wins.
+    for (let i = history.length - 1; i >= 0; i--) indexHistoryItem(history[i]);
+  }
+  return historyIndex;
+}
+
+function indexHistoryItem(item) {
+  if (!historyIndex) return;
+  if (item.type === 'image') historyIndex.image.set(item.image, item);
+  else historyIndex.text.set(item.text, item);
+}
+
+function forgetHistoryItem(item) {
+  if (!historyIndex) return;
+  const map = item.type === 'image' ? historyIndex.image : historyIndex.text;
+  const key = item.type === 'image' ? item.image : item.text;
+  if (map.get(key) === item) map.delete(key);
+}
+
+function invalidateHistoryIndex() {
+  historyIndex = null;
+}
+
+// Position of the item holding the same content as `entry`, or -1. The
+// lookup is O(1); the indexOf() that turns the hit into a position is
+// O(position), no more than the copyWithin() in addToHistory() that follows.
+function findInHistory(entry) {
+  const index = getHistoryIndex();
+  const hit = entry.type === 'image' ? index.image.get(entry.image) : index.text.get(entry.text);
+  if (!hit) return -1;
+  const idx = history.indexOf(hit); // identity scan — no string compares
+  return idx >= 0 && sameContent(hit, entry) ? idx : -1;
+}
+
+function addToHistory(entry) {
   // Check if already at top
-  if (history.length && matchFn(history[0])) return;
+  if (history.length && sameContent(history[0], entry)) return;
   // Find existing, preserve pin metadata
-  const existIdx = history.findIndex(matchFn);
+  const existIdx = findInHistory(entry);
   if (existIdx >= 0) {
     if (history[existIdx].pin) entry.pin = history[existIdx].pin;
-    history.splice(existIdx, 1);
+    // Re-copy of an existing item: shift only the items above it down one
+    // slot and drop the entry into the freed top slot, rather than
+    // splice() + unshift() each moving the whole array.
+    history.copyWithin(1, 0, existIdx);
+    history[0] = entry;
+  } else {
+    history.unshift(entry);
   }
-  history.unshift(entry);
-  pruneHistory();
-  saveHistory();
+  indexHistoryItem(entry);
+  if (entry.pin) numpadSlots = null; // took over the replaced item's pin
+  else oldestUnpinnedTs = Math.min(oldestUnpinnedTs, entry.ts || 0);
+  appendHistoryOp({ op: 'add', item: entry });
+  maybePruneHistory();
+}
+
+// Explorer and clipboard managers briefly open the clipboard right after
+// every copy, so our OpenClipboard can lose the race. Retry on a short
+// backoff via timers rather than sleeping on the main thread; lastSeq is
+// left alone meanwhile, so the change isn't marked as seen.
+const CLIPBOARD_RETRY_MS = [5, 10, 20, 40, 80];
+let clipboardRetries = 0;
+let clipboardRetryTimer = null;
+
+// Returns false once the retries are used up.
+function retryClipboardRead() {
+  if (clipboardRetryTimer) return true;
+  if (clipboardRetries >= CLIPBOARD_RETRY_MS.length) return false;
+  clipboardRetryTimer = setTimeout(() => {
+    clipboardRetryTimer = null;
+    pollClipboard();
+  }, CLIPBOARD_RETRY_MS[clipboardRetries++]);
+  return true;
 }
 
 function pollClipboard() {
   if (!pollGate) return;
 
+  // Windows: skip the clipboard open + image decode entirely when the
+  // sequence number says nothing changed since the last successful read.
+  // Always null on other platforms, so they read every tick as before.
+  const seq = winClipboard.getSequenceNumber();
+  if (seq != null && seq === lastSeq) return;
+
   try {
-    const img = clipboard.readImage();
-    if (!img.isEmpty()) {
-      const buf = img.toPNG();
-      const h = imageHash(buf);
+    // Windows: a single clipboard open reports whether an image is present
+    // and returns its PNG data or, if no image, the text — instead of
+    // readImage() + readText() each opening it. null elsewhere or if another
+    // app holds the clipboard.
+    const snap = winClipboard.readSnapshot();
+    if (seq != null && !snap && retryClipboardRead()) return;
+    // Got it, or out of retries — Electron's reads below have their own.
+    clipboardRetries = 0;
+    let img = null;
+    if (!snap || snap.hasImage) {
+      if (snap && snap.png) img = nativeImage.createFromBuffer(snap.png);
+      // DIB-only images (and undecodable PNG data) still go through Electron.
+      if (!img || img.isEmpty()) img = clipboard.readImage();
+    }
+    if (img && !img.isEmpty()) {
+      const h = imageHash(img);
       if (h !== lastImgHash) {
         lastImgHash = h;
         lastText = '';
-        const { fname, width, height } = saveClipboardImage(img);
-        addToHistory(
-          { type: 'image', image: fname, ts: Date.now() / 1000, width, height },
-          it => it.type === 'image' && it.image === fname
-        );
+        lastChangeAt = Date.now();
+        const { fname, width, height } = saveClipboardImage(img, h);
+        // `pin: null` (here and below) gives new entries the same shape as
+        // loaded ones, which migrateItemPin always gives a `pin`.
+        addToHistory({ type: 'image', image: fname, ts: Date.now() / 1000, width, height, pin: null });
       }
     } else {
-      const text = clipboard.readText();
+      const text = snap && !snap.hasImage ? snap.text : clipboard.readText();
       if (text && text !== lastText) {
         lastText = text;
         lastImgHash = '';
-        addToHistory(
-          { type: 'text', text, ts: Date.now() / 1000 },
-          it => it.text === text
-        );
+        lastChangeAt = Date.now();
+        addToHistory({ type: 'text', text, ts: Date.now() / 1000, pin: null });
       }
     }
+    lastSeq = seq;
   } catch {}
 }
 
+// Adaptive poll interval: fast while the popup is open (the list should feel
+// live), slower while hidden, and slower still once the clipboard has been
+// quiet for a minute. showPopup() forces an immediate poll, so the slow
+// intervals never show a stale list.
+const POLL_VISIBLE_MS = 200;
+const POLL_HIDDEN_MS = 1000;
+const POLL_IDLE_MS = 2000;
+const POLL_IDLE_AFTER_MS = 60000;
+
+function nextPollDelay() {
+  if (win && !win.isDestroyed() && win.isVisible()) return POLL_VISIBLE_MS;
+  return Date.now() - lastChangeAt < POLL_IDLE_AFTER_MS ? POLL_HIDDEN_MS : POLL_IDLE_MS;
+}
+
+let pollTimer = null;
+
+function schedulePoll() {
+  clearTimeout(pollTimer);
+  pollTimer = setTimeout(() => {
+    pollClipboard();
+    schedulePoll();
+  }, nextPollDelay());
+}
+
+function stopPolling() {
+  clearTimeout(pollTimer);
+  pollTimer = null;
+}
+
+// Re-opens the poll gate and reads whatever changed while it was closed. With
+// the event-driven listener no further notification arrives for that change.
+function openPollGate() {
+  pollGate = true;
+  pollClipboard();
+}
+
+// --- Clipboard change detection ---
+// Polls by default. On Windows, once the WM_CLIPBOARDUPDATE listener is up the
+// poll timer stops entirely and reads happen only when the clipboard changes;
+// polling resumes if the listener worker dies.
+let clipboardListener = null;
+
+function startClipboardWatch() {
+  schedulePoll();
+  if (process.platform !== 'win32') return;
+  const { install } = require('./lib/windows-clipboard-listener');
+  clipboardListener = install({
+    onChange: pollClipboard,
+    onReady: stopPolling,
+    onStop: schedulePoll,
+  });
+}
+
 // --- Clipboard backup/restore (simplified — backs up text/image/html/rtf) ---
+// Only reads the formats actually on the clipboard: readImage() decodes a
+// full bitmap, and readHTML()/readRTF() each open the clipboard again, so
+// reading everything made every numpad paste pay for formats that weren't
+// there.
 function backupClipboard() {
-  return {
-    text: clipboard.readText(),
-    html: clipboard.readHTML(),
-    rtf: clipboard.readRTF(),
-    image: clipboard.readImage(),
-  };
+  const formats = clipboard.availableFormats();
+  const backup = {};
+  if (formats.includes('text/plain')) backup.text = clipboard.readText();
+  if (formats.includes('text/html')) backup.html = clipboard.readHTML();
+  if (formats.includes('text/rtf')) backup.rtf = clipboard.readRTF();
+  if (formats.some(f => f.startsWith('image/'))) {
+    const image = clipboard.readImage();
+    if (!image.isEmpty()) backup.image = image;
+  }
+  return backup;
 }
 
+// A single write() replaces the clipboard with every saved format at once.
 function restoreClipboard(backup) {
   if (!backup) return;
-  clipboard.clear();
-  if (!backup.image.isEmpty()) {
-    clipboard.writeImage(backup.image);
-  } else if (backup.text) {
-    const formats = {};
-    if (backup.text) formats.text = backup.text;
-    if (backup.html) formats.html = backup.html;
-    if (backup.rtf) formats.rtf = backup.rtf;
-    clipboard.write(formats);
-  }
+  if (Object.keys(backup).length) clipboard.write(backup);
+  else clipboard.clear();
 }
 
 // --- Paste simulation ---
@@ -480,10 +1024,12 @@ async function numpadPaste(slotNum) {
   // otherwise rapid Num-key presses race and the second call's "backup"
   // captures the first call's pasted content.
   if (!pollGate) return;
-  const item = history.find(h => hasNumpadSlot(h, slotNum));
+  const item = getNumpadSlots().get(slotNum);
   if (!item) return;
 
   pollGate = false;
+  // Whether the poller had already read what's on the clipboard now.
+  const wasCurrent = lastSeq != null && winClipboard.getSequenceNumber() === lastSeq;
   const backup = backupClipboard();
   setClipboardToItem(item);
   // Minimum delay for Windows clipboard propagation before paste. 15ms is
@@ -494,8 +1040,14 @@ async function numpadPaste(slotNum) {
   // Fire-and-forget restore: the target app needs ~100-150ms to read from
   // the clipboard after receiving Ctrl+V. We don't block the caller on that.
   setTimeout(() => {
-    try { restoreClipboard(backup); } catch {}
-    pollGate = true;
+    try {
+      restoreClipboard(backup);
+      // The clipboard is back to content the poller already saw, so mark our
+      // own writes as read — reopening the gate then skips the read (and, for
+      // an image, the decode + hash) instead of rediscovering the same item.
+      if (wasCurrent) lastSeq = winClipboard.getSequenceNumber();
+    } catch {}
+    openPollGate();
   }, 150);
 }
 
@@ -590,6 +1142,9 @@ function showPopup() {
   const x = Math.min(Math.max(wx, cursor.x - WIN_W / 2), wx + ww - WIN_W);
   const y = Math.min(Math.max(wy, cursor.y - 50), wy + wh - WIN_H);
 
+  // Catch anything copied since the last (possibly slow, idle) poll tick.
+  pollClipboard();
+
   win.setPosition(Math.round(x), Math.round(y));
   win.show();
   win.moveTop();
@@ -597,10 +1152,33 @@ function showPopup() {
   if (windowsHook) windowsHook.setPopupVisible(true);
 }
 
+// The last image decoded for pasting. Numpad slots tend to be pasted over
+// and over in a burst; keeping one decoded bitmap skips the PNG decode on
+// repeats. Dropped after a short idle spell so a full-size bitmap doesn't
+// stay resident for the life of the app.
+const PASTE_IMAGE_CACHE_MS = 30000;
+let pasteImageCache = null; // { fname, img }
+let pasteImageCacheTimer = null;
+
+function decodedImage(fname) {
+  const pending = pendingImages.get(fname);
+  if (pending) return pending.img;
+  clearTimeout(pasteImageCacheTimer);
+  pasteImageCacheTimer = setTimeout(() => { pasteImageCache = null; }, PASTE_IMAGE_CACHE_MS);
+  if (pasteImageCache && pasteImageCache.fname === fname) return pasteImageCache.img;
+  // createFromPath decodes straight into a native bitmap. A missing file
+  // yields an empty image, so no separate existsSync probe is needed.
+  const img = nativeImage.createFromPath(path.join(IMG_DIR, fname));
+  pasteImageCache = img.isEmpty() ? null : { fname, img };
+  return img;
+}
+
 function setClipboardToItem(item) {
   if (item.type === 'image') {
-    const imgPath = path.join(IMG_DIR, item.image);
-    if (fs.existsSync(imgPath)) clipboard.writeImage(nativeImage.createFromPath(imgPath));
+    // writeImage hands the decoded bitmap to the OS clipboard without
+    // another encode.
+    const img = decodedImage(item.image);
+    if (!img.isEmpty()) clipboard.writeImage(img);
   } else {
     clipboard.writeText(item.text || '');
   }
@@ -612,8 +1190,11 @@ async function pasteAndHide(index) {
 
   pollGate = false;
   try {
-    setClipboardToItem(item);
+    // Hide first: for an image, setClipboardToItem() decodes the full PNG,
+    // and the popup shouldn't sit frozen on screen meanwhile. The clipboard
+    // is still set well before the paste keystroke below.
     hidePopup();
+    setClipboardToItem(item);
     if (process.platform === 'darwin') {
       // macOS: dock-hidden apps don't return focus automatically.
       // Use osascript to activate the frontmost app, then paste.
@@ -636,18 +1217,14 @@ async function pasteAndHide(index) {
       await simulatePaste();
     }
   } finally {
-    pollGate = true;
+    openPollGate();
   }
 }
 
 function createTray() {
-  const iconPath = path.join(__dirname, 'icon.png');
-  let trayIcon;
-  if (fs.existsSync(iconPath)) {
-    trayIcon = nativeImage.createFromPath(iconPath).resize({ width: 16, height: 16 });
-  } else {
-    trayIcon = nativeImage.createEmpty();
-  }
+  // Empty if icon.png is missing — no existsSync probe needed.
+  const trayIcon = nativeImage.createFromPath(path.join(__dirname, 'icon.png'))
+    .resize({ width: 16, height: 16 });
   if (process.platform === 'darwin') trayIcon.setTemplateImage(true);
 
   tray = new Tray(trayIcon);
@@ -682,6 +1259,7 @@ function openEditor(idx) {
       // Use item reference — survives index shifts from deletes/adds
       if (newText !== originalText && item.text === originalText) {
         item.text = newText;
+        invalidateHistoryIndex();
         saveHistory();
       }
     } catch {}
@@ -693,7 +1271,8 @@ function openEditor(idx) {
 
 // --- IPC handlers ---
 function setupIPC() {
-  ipcMain.handle('get-history', () => history);
+  ipcMain.handle('get-history', (e, knownVersion) =>
+    knownVersion === historyVersion ? null : { version: historyVersion, items: history });
 
   ipcMain.handle('get-settings', () => ({
     ...settings,
@@ -714,8 +1293,7 @@ function setupIPC() {
 
   ipcMain.handle('delete-item', (_, index) => {
     if (typeof index !== 'number' || index < 0 || index >= history.length) return;
-    removeItemImage(history[index]);
-    history.splice(index, 1);
+    removeHistoryAt(index);
     saveHistory();
   });
 
@@ -727,6 +1305,7 @@ function setupIPC() {
     }
     history.length = 0;
     history.push(...kept);
+    invalidateHistoryIndex();
     saveHistory();
   });
 
@@ -750,9 +1329,10 @@ function setupIPC() {
   ipcMain.handle('numpad-assign', (_, index, slot) => {
     if (typeof index !== 'number' || typeof slot !== 'number' ||
         slot < 1 || slot > 9 || index < 0 || index >= history.length) return;
-    // Strip the slot from any other item without unpinning them.
+    // Strip the slot from every holder without unpinning them — a sync merge
+    // can leave more than one, and the slot map only knows the first.
     for (const h of history) {
-      if (hasNumpadSlot(h, slot)) delete h.pin.number;
+      if (numpadSlotOf(h) === slot) delete h.pin.number;
     }
     ensurePin(history[index]).number = slot;
     saveHistory();
@@ -760,12 +1340,10 @@ function setupIPC() {
 
   ipcMain.handle('numpad-unassign', (_, slot) => {
     if (typeof slot !== 'number' || slot < 1 || slot > 9) return;
-    for (const h of history) {
-      if (hasNumpadSlot(h, slot)) {
-        delete h.pin.number;
-        saveHistory();
-        break;
-      }
+    const item = getNumpadSlots().get(slot);
+    if (item) {
+      delete item.pin.number;
+      saveHistory();
     }
   });
 
@@ -819,10 +1397,11 @@ function setupIPC() {
     saveHistory();
   });
 
-  ipcMain.handle('copy-image-path', (_, index) => {
+  ipcMain.handle('copy-image-path', async (_, index) => {
     if (typeof index !== 'number' || index < 0 || index >= history.length ||
         history[index].type !== 'image') return { path: null };
     const fname = history[index].image;
+    await pendingImages.get(fname)?.written;
     const src = path.join(IMG_DIR, fname);
     if (!fs.existsSync(src)) return { path: null };
     const dest = path.join(os.homedir(), 'Downloads', fname);
@@ -837,10 +1416,12 @@ function setupIPC() {
     openEditor(index);
   });
 
-  ipcMain.handle('open-image', (_, index) => {
+  ipcMain.handle('open-image', async (_, index) => {
     if (typeof index !== 'number' || index < 0 || index >= history.length ||
         history[index].type !== 'image') return;
-    const imgPath = path.join(IMG_DIR, history[index].image);
+    const fname = history[index].image;
+    await pendingImages.get(fname)?.written;
+    const imgPath = path.join(IMG_DIR, fname);
     if (fs.existsSync(imgPath)) shell.openPath(imgPath);
   });
 
@@ -1026,13 +1607,39 @@ protocol.registerSchemesAsPrivileged([
 
 // --- App lifecycle ---
 app.whenReady().then(() => {
-  protocol.handle('clip-img', (request) => {
+  protocol.handle('clip-img', async (request) => {
     const url = new URL(request.url);
     const fname = decodeURIComponent(url.hostname + url.pathname).replace(/^\/+/, '').replace(/\/+$/, '');
     const filePath = path.join(IMG_DIR, fname);
+    // Filenames are content hashes, so a name never changes meaning: it is
+    // its own ETag and the response can be cached forever.
+    const etag = `"${fname}"`;
+    if (request.headers.get('If-None-Match') === etag) {
+      // Only while the image still exists (a thumbnail lives and dies with
+      // its source) — a deleted or pruned one must 404, not stay cached.
+      const source = fname.endsWith(THUMB_SUFFIX) ? fname.slice(0, -THUMB_SUFFIX.length) + '.png' : fname;
+      if (pendingImages.has(source) || fs.existsSync(path.join(IMG_DIR, source))) {
+        return new Response(null, { status: 304 });
+      }
+    }
+    const headers = {
+      'Content-Type': 'image/png',
+      'Cache-Control': 'public, max-age=31536000, immutable',
+      ETag: etag,
+    };
     try {
-      const data = fs.readFileSync(filePath);
-      return new Response(data, { headers: { 'Content-Type': 'image/png' } });
+      if (fname.endsWith(THUMB_SUFFIX)) {
+        if (!thumbCache.has(fname)) {
+          await pendingImages.get(fname.slice(0, -THUMB_SUFFIX.length) + '.png')?.written;
+        }
+        return new Response(cachedThumbnail(fname), { headers });
+      }
+      await pendingImages.get(fname)?.written;
+      // Full-size screenshots can be tens of MB — stream them in 64 KB
+      // chunks instead of buffering the whole file per request.
+      const { size } = fs.statSync(filePath);
+      const body = Readable.toWeb(fs.createReadStream(filePath, { highWaterMark: 64 * 1024 }));
+      return new Response(body, { headers: { ...headers, 'Content-Length': String(size) } });
     } catch {
       return new Response('Not found', { status: 404 });
     }
@@ -1046,18 +1653,27 @@ app.whenReady().then(() => {
   createTray();
   registerShortcuts();
 
-  setInterval(pollClipboard, 400);
+  startClipboardWatch();
 
   // Sync with shared folder on startup + every 30s
   syncMerge();
   setInterval(syncMerge, 30000);
 
+  setInterval(pruneExpired, 60000);
+
   const hotkey = process.platform === 'darwin' ? 'Cmd+Shift+V' : 'Win+V';
   console.log(`Clipboard Tray running. ${hotkey} to open popup.`);
 });
 
 app.on('will-quit', () => {
+  if (historyFlushTimer || historyLogOps) flushHistory();
+  // Don't exit with a freshly copied image only half on disk (the thumbnail
+  // is regenerated on demand).
+  for (const [fname, { buf }] of pendingImages) {
+    try { fs.writeFileSync(path.join(IMG_DIR, fname), buf); } catch {}
+  }
   globalShortcut.unregisterAll();
   if (windowsHook) windowsHook.uninstall();
+  if (clipboardListener) clipboardListener.uninstall();
 });
 app.on('window-all-closed', () => { /* keep running as tray app */ });
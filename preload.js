@@ -1,7 +1,7 @@
 const { contextBridge, ipcRenderer } = require('electron');
 
 contextBridge.exposeInMainWorld('api', {
-  getHistory: () => ipcRenderer.invoke('get-history'),
+  getHistory: (knownVersion) => ipcRenderer.invoke('get-history', knownVersion),
   getSettings: () => ipcRenderer.invoke('get-settings'),
   paste: (index) => ipcRenderer.invoke('paste', index),
   pasteAndHide: (index) => ipcRenderer.invoke('paste-and-hide', index),